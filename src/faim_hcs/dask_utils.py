@@ -1,7 +1,15 @@
+import os
+from glob import glob
 from multiprocessing import Process, Queue
 from time import sleep
 
 import numpy as np
+from distributed.diagnostics.plugin import WorkerPlugin
+
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover
+    njit = None
 
 
 class LocalClusterFactory:
@@ -95,6 +103,117 @@ class LocalClusterFactory:
         return self._client
 
 
+def get_available_cpus() -> set[int]:
+    """
+    Get the CPUs this process may run on.
+
+    Respects the CPU affinity of the process, e.g. set by Slurm or a
+    container cpuset, where the platform supports it.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return set(os.sched_getaffinity(0))
+
+    return set(range(os.cpu_count() or 1))
+
+
+def get_numa_node_cpus() -> list[set[int]]:
+    """
+    Get the available CPUs of each NUMA node.
+
+    Nodes without any CPU available to this process are dropped. Returns an
+    empty list if the NUMA topology is not available, e.g. on other
+    platforms than Linux.
+    """
+    available_cpus = get_available_cpus()
+    node_cpus = []
+    for cpus in _read_numa_node_cpus():
+        cpus = cpus & available_cpus
+        if len(cpus) > 0:
+            node_cpus.append(cpus)
+
+    return node_cpus
+
+
+def _read_numa_node_cpus() -> list[set[int]]:
+    node_cpus = []
+    for cpulist in sorted(glob("/sys/devices/system/node/node[0-9]*/cpulist")):
+        with open(cpulist) as f:
+            node_cpus.append(parse_cpulist(f.read()))
+
+    return node_cpus
+
+
+def parse_cpulist(cpulist: str) -> set[int]:
+    """
+    Parse a Linux cpulist string like '0-3,8-11' into a set of CPU ids.
+    """
+    cpus = set()
+    for part in cpulist.strip().split(","):
+        if "-" in part:
+            start, end = part.split("-")
+            cpus.update(range(int(start), int(end) + 1))
+        elif part:
+            cpus.add(int(part))
+
+    return cpus
+
+
+def numa_cluster_kwargs() -> dict:
+    """
+    LocalCluster arguments with one worker process per NUMA node and one
+    thread per CPU of that node.
+
+    Falls back to a single worker process with one thread per available CPU
+    if the NUMA topology is not available.
+    """
+    node_cpus = get_numa_node_cpus()
+    if len(node_cpus) == 0:
+        return dict(
+            n_workers=1,
+            threads_per_worker=len(get_available_cpus()),
+            processes=True,
+            memory_limit="auto",
+        )
+
+    return dict(
+        n_workers=len(node_cpus),
+        threads_per_worker=min(len(cpus) for cpus in node_cpus),
+        processes=True,
+        memory_limit="auto",
+    )
+
+
+class PinToNumaNode(WorkerPlugin):
+    """
+    Pin each worker process to the CPUs of one NUMA node.
+
+    Workers are assigned to the nodes round-robin by their name, which is
+    the worker index for a LocalCluster. Only use this for clusters with
+    worker processes, pinning a threaded worker pins the whole client
+    process.
+
+    Note: Worker threads decode TIFFs and compress chunks in parallel
+    already, tifffile and blosc should therefore not spawn additional
+    threads inside of the workers.
+    """
+
+    name = "pin-to-numa-node"
+
+    def __init__(self, node_cpus: list[set[int]]):
+        self.node_cpus = node_cpus
+
+    def setup(self, worker):
+        if len(self.node_cpus) == 0 or not hasattr(os, "sched_setaffinity"):
+            return
+
+        try:
+            index = int(worker.name)
+        except (TypeError, ValueError):
+            return
+
+        os.sched_setaffinity(0, self.node_cpus[index % len(self.node_cpus)])
+
+
 def mean_cast_to(target_dtype):
     """
     Wrap np.mean to cast the result to a given dtype.
@@ -114,3 +233,57 @@ def mean_cast_to(target_dtype):
         ).astype(target_dtype)
 
     return _mean
+
+
+def mean22_uint(block):
+    """
+    Compute the 2x2 mean over the last two axes of an unsigned integer block.
+
+    For up to 32 bit integers the four pixels are summed in a wider integer
+    type and floor divided by four, which gives the same result as
+    mean_cast_to without going through float64. 64 bit integers have no
+    wider integer type to sum in and fall back to mean_cast_to. Odd
+    trailing rows and columns are trimmed. Uses a numba kernel if numba is
+    installed.
+    """
+    h, w = block.shape[-2] // 2 * 2, block.shape[-1] // 2 * 2
+    if block.dtype.itemsize > 4:
+        return mean_cast_to(block.dtype)(
+            block[..., :h, :w].reshape(block.shape[:-2] + (h // 2, 2, w // 2, 2)),
+            axis=(-3, -1),
+        )
+
+    if njit is not None:
+        n = int(np.prod(block.shape[:-2]))
+        src = block[..., :h, :w].reshape((n, h, w))
+        dst = np.empty((src.shape[0], h // 2, w // 2), dtype=block.dtype)
+        _mean22_uint_numba(src, dst)
+        return dst.reshape(block.shape[:-2] + (h // 2, w // 2))
+
+    acc = np.empty(
+        block.shape[:-2] + (h // 2, w // 2),
+        dtype=np.uint32 if block.dtype.itemsize <= 2 else np.uint64,
+    )
+    np.add(block[..., 0:h:2, 0:w:2], block[..., 1:h:2, 0:w:2], out=acc, dtype=acc.dtype)
+    np.add(acc, block[..., 0:h:2, 1:w:2], out=acc)
+    np.add(acc, block[..., 1:h:2, 1:w:2], out=acc)
+    np.right_shift(acc, 2, out=acc)
+    return acc.astype(block.dtype)
+
+
+if njit is not None:
+
+    # Blocks are already processed in parallel by dask. Launching parallel
+    # numba kernels from several dask threads is not supported by the
+    # default threading layer, hence the kernel itself is serial.
+    @njit(boundscheck=False, cache=True)
+    def _mean22_uint_numba(src, dst):
+        for i in range(dst.shape[0]):
+            for y in range(dst.shape[1]):
+                for x in range(dst.shape[2]):
+                    dst[i, y, x] = (
+                        np.uint64(src[i, 2 * y, 2 * x])
+                        + src[i, 2 * y, 2 * x + 1]
+                        + src[i, 2 * y + 1, 2 * x]
+                        + src[i, 2 * y + 1, 2 * x + 1]
+                    ) >> 2
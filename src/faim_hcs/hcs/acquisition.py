@@ -6,6 +6,7 @@ from typing import Any, Optional, Union
 
 import numpy as np
 import pandas as pd
+from tifffile import TiffFile
 
 from faim_hcs.io.ChannelMetadata import ChannelMetadata
 from faim_hcs.stitching import Tile
@@ -192,7 +193,14 @@ class WellAcquisition(ABC):
             type
         """
         if self._dtype is None:
-            self._dtype = self._tiles[0].load_data().dtype
+            tile = self._tiles[0]
+            if tile.path is not None:
+                # Corrections keep the data type, read it from the TIFF
+                # header instead of loading the tile.
+                with TiffFile(tile.path) as tif:
+                    self._dtype = tif.series[0].dtype
+            else:
+                self._dtype = tile.load_data().dtype
 
         return self._dtype
 
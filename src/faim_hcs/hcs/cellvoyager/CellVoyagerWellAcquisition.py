@@ -4,7 +4,7 @@ from typing import Optional, Union
 
 import numpy as np
 import pandas as pd
-from tifffile import imread
+from tifffile import TiffFile
 
 from faim_hcs.hcs.acquisition import TileAlignmentOptions, WellAcquisition
 from faim_hcs.hcs.cellvoyager.StackedTile import StackedTile
@@ -25,11 +25,13 @@ class CellVoyagerWellAcquisition(WellAcquisition):
         background_correction_matrices: dict[str, Union[Path, str]] = None,
         illumination_correction_matrices: dict[str, Union[Path, str]] = None,
         n_planes_in_stacked_tile: int = 1,
+        max_workers_per_stacked_tile: int = 4,
     ):
         self._metadata = metadata
         self._z_spacing = self._compute_z_spacing(files)
         self._dtype = self._get_dtype(files)
         self._n_planes_in_stacked_tile = n_planes_in_stacked_tile
+        self._max_workers_per_stacked_tile = max_workers_per_stacked_tile
         super().__init__(
             files=files,
             alignment=alignment,
@@ -38,7 +40,8 @@ class CellVoyagerWellAcquisition(WellAcquisition):
         )
 
     def _get_dtype(self, files: pd.DataFrame) -> np.dtype:
-        return imread(files["path"].iloc[0]).dtype
+        with TiffFile(files["path"].iloc[0]) as tif:
+            return tif.series[0].dtype
 
     def _compute_z_spacing(self, files: pd.DataFrame) -> Optional[float]:
         if "ZIndex" in files.columns:
@@ -133,6 +136,7 @@ class CellVoyagerWellAcquisition(WellAcquisition):
                     background_correction_matrix_path=bgcm,
                     illumination_correction_matrix_path=icm,
                     dtype=self._dtype,
+                    max_workers=self._max_workers_per_stacked_tile,
                 )
             )
 
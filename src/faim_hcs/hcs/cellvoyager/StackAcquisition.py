@@ -27,8 +27,10 @@ class StackAcquisition(PlateAcquisition):
         background_correction_matrices: Optional[dict[str, Union[Path, str]]] = None,
         illumination_correction_matrices: Optional[dict[str, Union[Path, str]]] = None,
         n_planes_in_stacked_tile: int = 1,
+        max_workers_per_stacked_tile: int = 4,
     ):
         self._n_planes_in_stacked_tile = n_planes_in_stacked_tile
+        self._max_workers_per_stacked_tile = max_workers_per_stacked_tile
         super().__init__(
             acquisition_dir=acquisition_dir,
             alignment=alignment,
@@ -74,6 +76,7 @@ class StackAcquisition(PlateAcquisition):
                     background_correction_matrices=self._background_correction_matrices,
                     illumination_correction_matrices=self._illumination_correction_matrices,
                     n_planes_in_stacked_tile=self._n_planes_in_stacked_tile,
+                    max_workers_per_stacked_tile=self._max_workers_per_stacked_tile,
                 )
             )
         return wells
@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 from typing import Optional, Union
 
@@ -5,7 +7,7 @@ import numpy as np
 from tifffile import imread
 
 from faim_hcs.stitching import Tile
-from faim_hcs.stitching.Tile import TilePosition
+from faim_hcs.stitching.Tile import TilePosition, _read_correction_matrix
 
 
 class StackedTile(Tile):
@@ -18,7 +20,30 @@ class StackedTile(Tile):
         position: TilePosition,
         background_correction_matrix_path: Optional[Union[Path, str]] = None,
         illumination_correction_matrix_path: Optional[Union[Path, str]] = None,
+        max_workers: int = 4,
     ):
+        """
+        Parameters
+        ----------
+        paths :
+            Paths to the planes of the tile. Missing planes are None.
+        shape :
+            Shape of the tile.
+        dtype :
+            Data type of the tile.
+        position :
+            Position of the tile.
+        background_correction_matrix_path :
+            Path to the background correction matrix.
+        illumination_correction_matrix_path :
+            Path to the illumination correction matrix.
+        max_workers :
+            Maximum number of threads reading the planes of the tile.
+            Tiles are loaded inside the dask worker threads, which run one
+            thread per CPU by default. Up to threads_per_worker *
+            max_workers planes are therefore read at the same time, keep
+            this small. Use 1 to read the planes serially.
+        """
         super().__init__(
             path=None,
             shape=(len(paths),) + shape[1:],
@@ -28,14 +53,39 @@ class StackedTile(Tile):
         )
         self._paths = paths
         self._dtype = dtype
+        self._max_workers = max_workers
 
     def load_data(self):
-        data = np.zeros(self.shape, dtype=self._dtype)
-        for i, path in enumerate(self._paths):
-            if path:
-                plane = imread(path)
-                plane = self._apply_background_correction(plane)
-                plane = self._apply_illumination_correction(plane)
-                data[i] = plane
+        data = np.empty(self.shape, dtype=self._dtype)
+        load_plane = partial(
+            self._load_plane,
+            correct=self.background_correction_matrix_path is not None
+            or self.illumination_correction_matrix_path is not None,
+        )
+        max_workers = min(len(self._paths), self._max_workers)
+        if max_workers > 1:
+            # Read the correction matrices before the planes are loaded in
+            # parallel, concurrent cache misses would each read them again.
+            for path in (
+                self.background_correction_matrix_path,
+                self.illumination_correction_matrix_path,
+            ):
+                if path is not None:
+                    _read_correction_matrix(path)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                # Every task writes into its own plane of data, no locking needed.
+                list(executor.map(load_plane, self._paths, data))
+        else:
+            for path, plane in zip(self._paths, data):
+                load_plane(path, plane)
 
         return data
+
+    def _load_plane(self, path, out, correct):
+        if path:
+            # Planes are already read in parallel, decode each with one thread.
+            imread(path, out=out, maxworkers=1)
+            if correct:
+                self._apply_corrections(out, out=out)
+        else:
+            out.fill(0)
@@ -20,6 +20,7 @@ class ZAdjustedStackAcquisition(StackAcquisition):
         background_correction_matrices: Optional[dict[str, Union[Path, str]]] = None,
         illumination_correction_matrices: Optional[dict[str, Union[Path, str]]] = None,
         n_planes_in_stacked_tile: int = 1,
+        max_workers_per_stacked_tile: int = 4,
     ):
         self._trace_log_files = trace_log_files
         super().__init__(
@@ -28,6 +29,7 @@ class ZAdjustedStackAcquisition(StackAcquisition):
             background_correction_matrices,
             illumination_correction_matrices,
             n_planes_in_stacked_tile=n_planes_in_stacked_tile,
+            max_workers_per_stacked_tile=max_workers_per_stacked_tile,
         )
 
     def _parse_files(self) -> DataFrame:
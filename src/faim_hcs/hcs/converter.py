@@ -3,10 +3,13 @@ from os.path import join
 from pathlib import Path
 from typing import Callable, Optional, Union
 
+import dask
 import dask.array as da
+import numpy as np
 import zarr
-from dask.distributed import Client, wait
+from dask.distributed import Client, LocalCluster, as_completed
 from numcodecs import Blosc
+from numcodecs.abc import Codec
 from ome_zarr.format import CurrentFormat
 from ome_zarr.io import parse_url
 from ome_zarr.writer import (
@@ -22,6 +25,9 @@ from faim_hcs.hcs.acquisition import PlateAcquisition
 from faim_hcs.hcs.plate import PlateLayout, get_rows_and_columns
 from faim_hcs.stitching import stitching_utils
 
+# Favours write throughput over compression ratio.
+DEFAULT_COMPRESSOR = Blosc(cname="lz4", clevel=5, shuffle=Blosc.BITSHUFFLE)
+
 
 class NGFFPlate(BaseModel):
     root_dir: Union[Path, str]
@@ -46,6 +52,9 @@ class ConvertToNGFFPlate:
         warp_func: Callable = stitching_utils.translate_tiles_2d,
         fuse_func: Callable = stitching_utils.fuse_mean,
         client: Client = None,
+        compressor: Codec = DEFAULT_COMPRESSOR,
+        streaming_buffer_bytes: Optional[int] = None,
+        cluster_kwargs: Optional[dict] = None,
     ):
         """
         Parameters
@@ -54,12 +63,34 @@ class ConvertToNGFFPlate:
             NGFF plate information.
         yx_binning :
             YX binning factor.
+        stitching_yx_chunk_size_factor :
+            Multiple of the output YX chunk size used as chunk size when
+            stitching the well images. Use a multiple of yx_binning to get
+            stitched chunks which map onto the output chunks after binning.
         warp_func :
             Function used to warp tile images.
         fuse_func :
             Function used to fuse tile images.
         client :
-            Dask client used for the conversion.
+            Dask client used for the conversion. If None, a LocalCluster
+            is started when the conversion is run and closed again once it
+            has finished.
+        compressor :
+            Compressor used for the zarr arrays if no storage options are
+            given. Defaults to DEFAULT_COMPRESSOR, Blosc with lz4 and
+            bit-shuffle, which favours write throughput. Use e.g.
+            Blosc(cname="zstd") for smaller files.
+        streaming_buffer_bytes :
+            If set, the full resolution well image is stitched and written
+            in horizontal segments of at most this many bytes, one segment
+            after the other, to bound peak memory. The resolution pyramid is
+            then computed from the written data. If None, each well is
+            written as a single dask graph.
+        cluster_kwargs :
+            Arguments for the LocalCluster which is started if no client is
+            given. They update the defaults of one worker process per NUMA
+            node with one thread per CPU of the node. Workers are pinned to
+            their node if they run in separate processes.
         """
         assert (
             isinstance(yx_binning, int) and yx_binning >= 1
@@ -70,6 +101,35 @@ class ConvertToNGFFPlate:
         self._warp_func = warp_func
         self._fuse_func = fuse_func
         self._client = client
+        self._compressor = compressor
+        self._streaming_buffer_bytes = streaming_buffer_bytes
+        self._cluster_kwargs = cluster_kwargs
+        self._local_cluster = None
+
+    def _get_client(self) -> Client:
+        if self._client is None:
+            cluster_kwargs = dask_utils.numa_cluster_kwargs()
+            cluster_kwargs.update(self._cluster_kwargs or {})
+            self._local_cluster = LocalCluster(**cluster_kwargs)
+            self._client = Client(self._local_cluster)
+            if cluster_kwargs["processes"]:
+                plugin = dask_utils.PinToNumaNode(dask_utils.get_numa_node_cpus())
+                if hasattr(self._client, "register_plugin"):
+                    self._client.register_plugin(plugin)
+                else:
+                    # Older distributed versions without register_plugin.
+                    self._client.register_worker_plugin(plugin)
+
+        return self._client
+
+    def _close_local_cluster(self):
+        # Only close the cluster started by _get_client, a client passed in
+        # by the user is left untouched.
+        if self._local_cluster is not None:
+            self._client.close()
+            self._local_cluster.close()
+            self._client = None
+            self._local_cluster = None
 
     def create_zarr_plate(
         self, plate_acquisition: PlateAcquisition, wells: Optional[list[str]] = None
@@ -145,39 +205,72 @@ class ConvertToNGFFPlate:
             zarr.Group of the plate.
         """
         assert 2 <= len(chunks) <= 3, "Chunks must be 2D or 3D."
-        assert len(chunks) == len(
-            plate_acquisition.get_well_acquisitions()[0].get_tiles()[0].shape
+        assert (
+            len(chunks)
+            == plate_acquisition.get_well_acquisitions()[0].get_tiles()[0].ndim
         ), "Chunks must have the same number of dimensions as the tile shape."
         well_acquisitions = plate_acquisition.get_well_acquisitions(wells)
+        common_well_shape = plate_acquisition.get_common_well_shape()
+        omero_channels = plate_acquisition.get_omero_channel_metadata()
+        acquisition_channels = [
+            ch_metadata.dict()
+            for ch_metadata in plate_acquisition.get_channel_metadata().values()
+        ]
 
-        for well_acquisition in well_acquisitions:
-            well_group = self._create_well_group(
-                plate,
-                well_acquisition,
-                well_sub_group,
-            )
-            group = well_group[well_sub_group]
-            self._write_stitched_image(
-                group,
-                chunks,
-                plate_acquisition,
-                storage_options,
-                well_acquisition,
-            )
-            shapes, datasets = self._build_pyramid(
-                group,
-                chunks,
-                max_layer,
-                storage_options,
-            )
-            self._write_metadata(
-                group, max_layer, shapes, datasets, plate_acquisition, well_acquisition
-            )
+        try:
+            well_writes = {}
+            for well_acquisition in well_acquisitions:
+                well_group = self._create_well_group(
+                    plate,
+                    well_acquisition,
+                    well_sub_group,
+                )
+                group = well_group[well_sub_group]
+                stitched_image, layers = self._write_stitched_image(
+                    group,
+                    chunks,
+                    common_well_shape,
+                    storage_options,
+                    well_acquisition,
+                )
+                shapes, datasets, pyramid = self._build_pyramid(
+                    group,
+                    chunks,
+                    max_layer,
+                    storage_options,
+                    stitched_image,
+                )
+                # Submit every well right away, the scheduler works on all of
+                # them concurrently.
+                future = self._get_client().compute(dask.delayed([*layers, *pyramid]))
+                well_writes[future] = (group, shapes, datasets, well_acquisition)
+
+            for future in as_completed(well_writes):
+                future.result()
+                group, shapes, datasets, well_acquisition = well_writes[future]
+                self._write_metadata(
+                    group,
+                    max_layer,
+                    shapes,
+                    datasets,
+                    well_acquisition,
+                    omero_channels,
+                    acquisition_channels,
+                )
+        finally:
+            self._close_local_cluster()
 
         return plate
 
     def _write_metadata(
-        self, group, max_layer, shapes, datasets, plate_acquisition, well_acquisition
+        self,
+        group,
+        max_layer,
+        shapes,
+        datasets,
+        well_acquisition,
+        omero_channels,
+        acquisition_channels,
     ):
         coordinate_transformations = well_acquisition.get_coordinate_transformations(
             max_layer=max_layer,
@@ -198,47 +291,50 @@ class ConvertToNGFFPlate:
             fmt,
             axes,
         )
-        group.attrs["omero"] = {
-            "channels": plate_acquisition.get_omero_channel_metadata()
-        }
-        group.attrs["acquisition_metadata"] = {
-            "channels": [
-                ch_metadata.dict()
-                for ch_metadata in plate_acquisition.get_channel_metadata().values()
-            ]
-        }
+        group.attrs["omero"] = {"channels": omero_channels}
+        group.attrs["acquisition_metadata"] = {"channels": acquisition_channels}
 
     def _write_stitched_image(
         self,
         group,
         chunks,
-        plate_acquisition,
+        output_shape,
         storage_options,
         well_acquisition,
     ):
         stitched_well_da = self._stitch_well_image(
             chunks,
             well_acquisition,
-            output_shape=plate_acquisition.get_common_well_shape(),
+            output_shape=output_shape,
         )
         binned_da = self._bin_yx(stitched_well_da).squeeze()
         rechunked_da = binned_da.rechunk(self._out_chunks(binned_da.shape, chunks))
-        options = self._get_storage_options(storage_options, rechunked_da.shape, chunks)
-        wait(
-            self._client.persist(
-                da.to_zarr(
-                    arr=rechunked_da,
-                    url=group.store,
-                    compute=False,
-                    component=str(Path(group.path, "0")),
-                    storage_options=options,
-                    compressor=options.get(
-                        "compressor", zarr.storage.default_compressor
-                    ),
-                    dimension_separator=group._store._dimension_separator,
-                ),
-            )
+        options = self._get_storage_options(
+            storage_options, rechunked_da.shape, chunks, self._compressor
         )
+        if self._streaming_buffer_bytes is not None:
+            return self._write_stitched_image_segments(group, rechunked_da, options)
+
+        target = self._create_array(group, "0", rechunked_da, options)
+        layer = rechunked_da.store(target, lock=False, compute=False)
+        return rechunked_da, [layer]
+
+    def _write_stitched_image_segments(self, group, image, options):
+        target = self._create_array(group, "0", image, options)
+        # Segments are whole rows of chunks, such that no chunk is written twice.
+        y_chunk = image.chunksize[-2]
+        chunk_row_bytes = y_chunk * image.size // image.shape[-2] * image.itemsize
+        segment_rows = max(1, self._streaming_buffer_bytes // chunk_row_bytes) * y_chunk
+        for y_start in range(0, image.shape[-2], segment_rows):
+            region = (slice(None),) * (image.ndim - 2) + (
+                slice(y_start, min(y_start + segment_rows, image.shape[-2])),
+                slice(None),
+            )
+            self._get_client().compute(
+                image[region].store(target, regions=region, lock=False, compute=False)
+            ).result()
+
+        return da.from_zarr(target), []
 
     def _build_pyramid(
         self,
@@ -246,44 +342,68 @@ class ConvertToNGFFPlate:
         chunks,
         max_layer,
         storage_options,
+        stitched_image,
     ):
-        image = da.from_zarr(url=group.store, component=str(Path(group.path, "0")))
-        datasets = [{"path": "0"}]
+        # Downsample from the in-memory graph of the previous level instead
+        # of reading it back from zarr.
+        image = stitched_image
+        # Downsampling only changes the YX extent, the number of dimensions
+        # and therefore the storage options are the same for every level.
+        options = self._get_storage_options(
+            storage_options, image.shape, chunks, self._compressor
+        )
+        datasets = [{"path": str(path)} for path in range(max_layer + 1)]
         shapes = [image.shape]
-        for path in range(1, max_layer + 1):
-            image = da.coarsen(
-                reduction=dask_utils.mean_cast_to(image.dtype),
-                x=image,
-                axes={
-                    image.ndim - 2: 2,
-                    image.ndim - 1: 2,
-                },
-                trim_excess=True,
-            )
-            options = self._get_storage_options(storage_options, image.shape, chunks)
-            image = image.rechunk(options["chunks"])
-            wait(
-                self._client.persist(
-                    da.to_zarr(
-                        arr=image,
-                        url=group.store,
-                        compute=False,
-                        component=str(Path(group.path, str(path))),
-                        storage_options=options,
-                        compressor=options.get(
-                            "compressor", zarr.storage.default_compressor
-                        ),
-                        dimension_separator=group._store._dimension_separator,
-                    )
-                )
-            )
-            datasets.append({"path": str(path)})
+        pyramid = []
+        for dataset in datasets[1:]:
+            image = self._downsample_yx(image).rechunk(options["chunks"])
+            target = self._create_array(group, dataset["path"], image, options)
+            pyramid.append(image.store(target, lock=False, compute=False))
             shapes.append(image.shape)
-            image = da.from_zarr(
-                url=group.store, component=str(Path(group.path, str(path)))
+
+        return shapes, datasets, pyramid
+
+    @staticmethod
+    def _create_array(group, path, image, options):
+        # Create the array on the open group, the dask array is stored into
+        # it directly without re-opening the store.
+        return group.create_dataset(
+            path,
+            shape=image.shape,
+            chunks=image.chunksize,
+            dtype=image.dtype,
+            compressor=options.get("compressor", zarr.storage.default_compressor),
+            dimension_separator=group._store._dimension_separator,
+        )
+
+    @staticmethod
+    def _downsample_yx(image):
+        yx_chunks = image.chunks[-2:]
+        if (
+            np.issubdtype(image.dtype, np.unsignedinteger)
+            and image.dtype.itemsize <= 4
+            and all(c % 2 == 0 for axis_chunks in yx_chunks for c in axis_chunks[:-1])
+        ):
+            # All pixel pairs lie within a block, no coarsen rechunk needed.
+            # 64 bit integers would overflow the integer sum of mean22_uint.
+            return image.map_blocks(
+                dask_utils.mean22_uint,
+                chunks=image.chunks[:-2]
+                + tuple(
+                    tuple(c // 2 for c in axis_chunks) for axis_chunks in yx_chunks
+                ),
+                dtype=image.dtype,
             )
 
-        return shapes, datasets
+        return da.coarsen(
+            reduction=dask_utils.mean_cast_to(image.dtype),
+            x=image,
+            axes={
+                image.ndim - 2: 2,
+                image.ndim - 1: 2,
+            },
+            trim_excess=True,
+        )
 
     def _bin_yx(self, image_da):
         if self._yx_binning > 1:
@@ -310,17 +430,18 @@ class ConvertToNGFFPlate:
     ):
         from faim_hcs.stitching import DaskTileStitcher
 
-        tile_data_ndims = well_acquisition.get_tiles()[0].load_data().ndim
+        yx_factor = self._stitching_yx_chunk_size_factor
+        tile_data_ndims = well_acquisition.get_tiles()[0].ndim
         if tile_data_ndims == 2:
             chunk_shape = (
-                chunks[-2],
-                chunks[-1],
+                chunks[-2] * yx_factor,
+                chunks[-1] * yx_factor,
             )
         elif tile_data_ndims == 3:
             chunk_shape = (
                 chunks[-3],
-                chunks[-2],
-                chunks[-1],
+                chunks[-2] * yx_factor,
+                chunks[-1] * yx_factor,
             )
         else:
             raise NotImplementedError("Tile data must be 2D or 3D.")  # pragma: no cover
@@ -349,11 +470,12 @@ class ConvertToNGFFPlate:
         storage_options: dict,
         output_shape: tuple[int, ...],
         chunks: tuple[int, ...],
+        compressor: Codec = DEFAULT_COMPRESSOR,
     ):
         if storage_options is None:
             return dict(
                 dimension_separator="/",
-                compressor=Blosc(cname="zstd", clevel=3, shuffle=Blosc.SHUFFLE),
+                compressor=compressor,
                 chunks=ConvertToNGFFPlate._out_chunks(output_shape, chunks),
                 write_empty_chunks=False,
             )
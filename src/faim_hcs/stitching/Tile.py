@@ -1,3 +1,5 @@
+import os
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Union
 
@@ -21,6 +23,30 @@ class TilePosition(BaseModel):
         return self.__repr__()
 
 
+def _read_correction_matrix(path: Union[Path, str]) -> NDArray:
+    """
+    Read a correction matrix once per process, it is shared by all tiles
+    and planes of a channel.
+
+    The modification time and size of the file are part of the cache key,
+    a matrix which is rewritten at the same path is read again. Up to 32
+    matrices are kept, enough for a background and an illumination
+    correction matrix for each of 16 channels. Tiles of more channels
+    are processed interleaved and will re-read evicted matrices.
+    """
+    stat = os.stat(path)
+    return _read_correction_matrix_cached(path, stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=32)
+def _read_correction_matrix_cached(
+    path: Union[Path, str], mtime_ns: int, size: int
+) -> NDArray:
+    matrix = imread(path)
+    matrix.flags.writeable = False
+    return matrix
+
+
 class Tile:
     """
     A tile with a path to the image data, shape and position.
@@ -56,6 +82,13 @@ class Tile:
     def __str__(self):
         return self.__repr__()
 
+    @property
+    def ndim(self) -> int:
+        """
+        Number of dimensions of the tile data, without loading it.
+        """
+        return len(self.shape)
+
     def get_yx_position(self) -> tuple[int, int]:
         return self.position.y, self.position.x
 
@@ -80,31 +113,57 @@ class Tile:
         Image data
         """
         data = imread(self.path)
-        data = self._apply_background_correction(data)
-        data = self._apply_illumination_correction(data)
+        data = self._apply_corrections(data)
 
         return data
 
-    def _apply_illumination_correction(self, data):
-        dtype = data.dtype
-        if self.illumination_correction_matrix_path is not None:
-            icm = imread(self.illumination_correction_matrix_path)
-            assert icm.shape == data.shape, (
-                f"Illumination correction matrix shape {icm.shape} "
-                f"does not match image shape {data.shape}."
-            )
-            mi, ma = np.iinfo(dtype).min, np.iinfo(dtype).max
-            data = np.clip(data / icm, a_min=mi, a_max=ma).astype(dtype)
-        return data
+    def _apply_corrections(self, data, out=None):
+        """
+        Apply background and illumination correction to data.
 
-    def _apply_background_correction(self, data):
-        dtype = data.dtype
+        Both corrections are computed on one intermediate array, which is
+        clipped to the value range of data and cast into out. The result
+        is the same as subtracting the background, casting to the data
+        type and then dividing by the illumination correction matrix.
+        If no correction applies, data is copied into out.
+        """
+        bgcm, icm = None, None
         if self.background_correction_matrix_path is not None:
-            bgcm = imread(self.background_correction_matrix_path)
+            bgcm = _read_correction_matrix(self.background_correction_matrix_path)
             assert bgcm.shape == data.shape, (
                 f"Background correction matrix shape {bgcm.shape} "
                 f"does not match image shape {data.shape}."
             )
-            mi, ma = np.iinfo(dtype).min, np.iinfo(dtype).max
-            data = np.clip(data - bgcm, a_min=mi, a_max=ma).astype(dtype)
-        return data
+        if self.illumination_correction_matrix_path is not None:
+            icm = _read_correction_matrix(self.illumination_correction_matrix_path)
+            assert icm.shape == data.shape, (
+                f"Illumination correction matrix shape {icm.shape} "
+                f"does not match image shape {data.shape}."
+            )
+        if bgcm is None and icm is None:
+            if out is None or out is data:
+                return data
+            np.copyto(out, data)
+            return out
+
+        mi, ma = np.iinfo(data.dtype).min, np.iinfo(data.dtype).max
+        corrected = data
+        if bgcm is not None:
+            corrected = np.subtract(data, bgcm)
+            if icm is not None:
+                np.clip(corrected, a_min=mi, a_max=ma, out=corrected)
+                if np.issubdtype(corrected.dtype, np.floating):
+                    np.trunc(corrected, out=corrected)
+        if icm is not None:
+            # Divide with the precision data / icm would have.
+            dtype = np.result_type(data.dtype, icm.dtype)
+            if not np.issubdtype(dtype, np.floating):
+                dtype = np.float64
+            if corrected is not data and corrected.dtype == dtype:
+                np.divide(corrected, icm, out=corrected)
+            else:
+                corrected = np.divide(corrected, icm, dtype=dtype)
+
+        if out is None:
+            out = np.empty_like(data)
+        return np.clip(corrected, a_min=mi, a_max=ma, out=out, casting="unsafe")
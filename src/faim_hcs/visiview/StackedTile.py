@@ -33,6 +33,4 @@ class StackedTile(Tile):
         else:
             data = tifffile.imread(self.path)
 
-        data = self._apply_background_correction(data)
-        data = self._apply_illumination_correction(data)
-        return data
+        return self._apply_corrections(data)
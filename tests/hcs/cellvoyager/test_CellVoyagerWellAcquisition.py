@@ -63,6 +63,7 @@ def test__assemble_tiles_missing_acquisition(files, metadata):
         alignment=TileAlignmentOptions.GRID,
         metadata=metadata,
         n_planes_in_stacked_tile=2,
+        max_workers_per_stacked_tile=1,
     )
 
     tiles = cv_well_acquisition._assemble_tiles()
@@ -79,6 +80,7 @@ def test__assemble_tiles_missing_acquisition(files, metadata):
         assert tile.position.z in [1, 3]
         assert tile.position.y in list(-(files["Y"].unique() / 0.65).astype(int))
         assert tile.position.x in list((files["X"].unique() / 0.65).astype(int))
+        assert tile._max_workers == 1
         assert tile.load_data().shape == tile.shape
 
 
@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+import pytest
+from numpy.testing import assert_array_equal
+from tifffile import imwrite
+
+from faim_hcs.hcs.cellvoyager.StackedTile import StackedTile
+from faim_hcs.stitching.Tile import TilePosition, _read_correction_matrix_cached
+
+
+@pytest.fixture
+def tmp_dir(tmp_path_factory):
+    return tmp_path_factory.mktemp("stacked_tile")
+
+
+@pytest.fixture
+def planes(tmp_dir):
+    paths, imgs = [], []
+    for z in range(3):
+        img = (np.random.rand(10, 10) * 255).astype(np.uint16) + 100
+        imwrite(tmp_dir / f"plane_{z}.tif", img)
+        paths.append(tmp_dir / f"plane_{z}.tif")
+        imgs.append(img)
+    return paths, imgs
+
+
+@pytest.fixture
+def bgcm(tmp_dir):
+    img = (np.ones((10, 10)) * 50).astype(np.uint16)
+    imwrite(tmp_dir / "bgcm.tif", img)
+    return tmp_dir / "bgcm.tif", img
+
+
+@pytest.fixture
+def icm(tmp_dir):
+    img = (np.ones((10, 10)) * 2).astype(np.uint16)
+    imwrite(tmp_dir / "icm.tif", img)
+    return tmp_dir / "icm.tif", img
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_load_data(planes, bgcm, icm, max_workers):
+    paths, imgs = planes
+    tile = StackedTile(
+        paths=[paths[0], None, paths[2]],
+        shape=(3, 10, 10),
+        dtype=np.uint16,
+        position=TilePosition(time=0, channel=0, z=0, y=0, x=0),
+        max_workers=max_workers,
+    )
+    data = tile.load_data()
+    assert data.shape == (3, 10, 10)
+    assert data.dtype == np.uint16
+    assert_array_equal(data[0], imgs[0])
+    assert_array_equal(data[1], np.zeros((10, 10), dtype=np.uint16))
+    assert_array_equal(data[2], imgs[2])
+
+    tile = StackedTile(
+        paths=paths,
+        shape=(3, 10, 10),
+        dtype=np.uint16,
+        position=TilePosition(time=0, channel=0, z=0, y=0, x=0),
+        background_correction_matrix_path=bgcm[0],
+        illumination_correction_matrix_path=icm[0],
+        max_workers=max_workers,
+    )
+    misses = _read_correction_matrix_cached.cache_info().misses
+    data = tile.load_data()
+    # Each correction matrix is read from disk only once for all planes.
+    assert _read_correction_matrix_cached.cache_info().misses == misses + 2
+    for i in range(3):
+        assert_array_equal(data[i], ((imgs[i] - bgcm[1]) / icm[1]).astype(np.uint16))
+
+
+def test_load_data_single_plane(planes):
+    paths, imgs = planes
+    tile = StackedTile(
+        paths=paths[:1],
+        shape=(1, 10, 10),
+        dtype=np.uint16,
+        position=TilePosition(time=0, channel=0, z=0, y=0, x=0),
+    )
+    data = tile.load_data()
+    assert data.shape == (1, 10, 10)
+    assert_array_equal(data[0], imgs[0])
+
+
+def test_load_data_rewritten_correction_matrix(planes, bgcm):
+    paths, imgs = planes
+    tile = StackedTile(
+        paths=paths,
+        shape=(3, 10, 10),
+        dtype=np.uint16,
+        position=TilePosition(time=0, channel=0, z=0, y=0, x=0),
+        background_correction_matrix_path=bgcm[0],
+    )
+    assert_array_equal(tile.load_data()[0], imgs[0] - bgcm[1])
+
+    # Rewrite the matrix at the same path, the cached matrix must not be used.
+    stat = os.stat(bgcm[0])
+    imwrite(bgcm[0], (np.ones((10, 10)) * 20).astype(np.uint16))
+    os.utime(bgcm[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert_array_equal(tile.load_data()[0], imgs[0] - 20)
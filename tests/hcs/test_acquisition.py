@@ -331,6 +331,8 @@ def test_get_dtype(dummy_well):
             position=TilePosition(time=0, channel=0, z=0, y=0, x=0),
         )
     ]
+    # The data type is read from the TIFF header without loading the tile.
+    dummy_well._tiles[0].load_data = None
 
     assert dummy_well.get_dtype() == np.uint16
 
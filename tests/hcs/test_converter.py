@@ -11,7 +11,7 @@ from numcodecs import Blosc
 from faim_hcs import dask_utils
 from faim_hcs.hcs.acquisition import TileAlignmentOptions
 from faim_hcs.hcs.cellvoyager import StackAcquisition
-from faim_hcs.hcs.converter import ConvertToNGFFPlate, NGFFPlate
+from faim_hcs.hcs.converter import DEFAULT_COMPRESSOR, ConvertToNGFFPlate, NGFFPlate
 from faim_hcs.hcs.plate import PlateLayout
 from faim_hcs.stitching import Tile
 from faim_hcs.stitching.Tile import TilePosition
@@ -145,10 +145,21 @@ def test__get_storage_options():
     )
     assert storage_options == {
         "dimension_separator": "/",
-        "compressor": Blosc(cname="zstd", clevel=3, shuffle=Blosc.SHUFFLE),
+        "compressor": Blosc(cname="lz4", clevel=5, shuffle=Blosc.BITSHUFFLE),
         "chunks": (1, 1, 5, 10, 5),
         "write_empty_chunks": False,
     }
+    assert storage_options["compressor"] is DEFAULT_COMPRESSOR
+
+    storage_options = ConvertToNGFFPlate._get_storage_options(
+        storage_options=None,
+        output_shape=(1, 2, 5, 10, 10),
+        chunks=(5, 10, 5),
+        compressor=Blosc(cname="zstd", clevel=3, shuffle=Blosc.SHUFFLE),
+    )
+    assert storage_options["compressor"] == Blosc(
+        cname="zstd", clevel=3, shuffle=Blosc.SHUFFLE
+    )
 
     storage_options = ConvertToNGFFPlate._get_storage_options(
         storage_options={
@@ -170,6 +181,24 @@ def test__mean_cast_to():
     assert mean_cast_to(input) == 1
 
 
+@pytest.mark.parametrize("dtype", [np.uint16, np.uint64, np.float32])
+def test__downsample_yx(dtype):
+    image = dask.array.from_array(
+        (np.random.rand(2, 21, 19) * 1000).astype(dtype), chunks=(1, 8, 6)
+    )
+    expected = dask.array.coarsen(
+        reduction=dask_utils.mean_cast_to(dtype),
+        x=image,
+        axes={1: 2, 2: 2},
+        trim_excess=True,
+    )
+
+    downsampled = ConvertToNGFFPlate._downsample_yx(image)
+    assert downsampled.shape == (2, 10, 9)
+    assert downsampled.dtype == dtype
+    np.testing.assert_array_equal(downsampled.compute(), expected.compute())
+
+
 def test__create_well_group(tmp_dir, plate_acquisition, hcs_plate):
     converter = ConvertToNGFFPlate(hcs_plate)
     zarr_plate = converter.create_zarr_plate(plate_acquisition)
@@ -192,6 +221,7 @@ def test__stitch_well_image_2d(tmp_dir, plate_acquisition_2d, hcs_plate):
     )
     assert isinstance(well_img_da, dask.array.core.Array)
     assert well_img_da.shape == (1, 2, 4, 4000, 4000)
+    assert well_img_da.chunksize == (1, 1, 1, 1000, 1000)
     assert well_img_da.dtype == np.uint16
 
 
@@ -213,6 +243,23 @@ def test__stitch_well_image_3d(tmp_dir, plate_acquisition, hcs_plate):
     assert well_img_da.dtype == np.uint16
 
 
+def test__stitch_well_image_chunk_size_factor(tmp_dir, plate_acquisition, hcs_plate):
+    converter = ConvertToNGFFPlate(
+        hcs_plate,
+        yx_binning=2,
+        stitching_yx_chunk_size_factor=2,
+    )
+    well_acquisition = plate_acquisition.get_well_acquisitions()[0]
+    well_img_da = converter._stitch_well_image(
+        chunks=(1, 1, 10, 1000, 1000),
+        well_acquisition=well_acquisition,
+        output_shape=plate_acquisition.get_common_well_shape(),
+    )
+    assert well_img_da.chunksize == (1, 1, 4, 2000, 2000)
+    binned_yx = converter._bin_yx(well_img_da)
+    assert binned_yx.chunksize == (1, 1, 4, 1000, 1000)
+
+
 def test__bin_yx(tmp_dir, plate_acquisition, hcs_plate):
     converter = ConvertToNGFFPlate(
         hcs_plate,
@@ -276,6 +323,15 @@ def test_run(tmp_dir, plate_acquisition, hcs_plate):
         assert plate[row][col]["0"]["0"].shape == (2, 4, 2000, 2000)
         assert plate[row][col]["0"]["1"].shape == (2, 4, 1000, 1000)
 
+    # Existing image data is never overwritten.
+    with pytest.raises(zarr.errors.ContainsArrayError):
+        converter.run(
+            plate=plate,
+            plate_acquisition=plate_acquisition,
+            max_layer=2,
+            chunks=(1, 2000, 2000),
+        )
+
 
 def test_run_selection(tmp_dir, plate_acquisition, hcs_plate):
     converter = ConvertToNGFFPlate(
@@ -322,3 +378,57 @@ def test_provide_client(tmp_dir, plate_acquisition, hcs_plate):
         client=Client(),
     )
     assert converter._client is not None
+
+
+def test_run_streaming(tmp_dir, plate_acquisition, hcs_plate):
+    converter = ConvertToNGFFPlate(
+        hcs_plate,
+        yx_binning=2,
+        client=LocalCluster(
+            n_workers=1, threads_per_worker=4, processes=False
+        ).get_client(),
+        streaming_buffer_bytes=8 * 1000 * 2000 * 2,
+    )
+    plate = converter.create_zarr_plate(plate_acquisition)
+    plate = converter.run(
+        plate=plate,
+        plate_acquisition=plate_acquisition,
+        max_layer=2,
+        wells=["D08"],
+        chunks=(1, 1000, 1000),
+    )
+    path = join(tmp_dir, "plate_name.zarr", "D", "08", "0")
+    assert exists(join(path, "0", ".zarray"))
+    assert exists(join(path, "1", ".zarray"))
+    assert "multiscales" in plate["D"]["08"]["0"].attrs.keys()
+    assert plate["D"]["08"]["0"]["0"].shape == (2, 4, 2000, 2000)
+    assert plate["D"]["08"]["0"]["0"].chunks == (1, 1, 1000, 1000)
+    assert plate["D"]["08"]["0"]["1"].shape == (2, 4, 1000, 1000)
+    assert plate["D"]["08"]["0"]["2"].shape == (2, 4, 500, 500)
+
+
+def test_start_local_cluster(tmp_dir, plate_acquisition, hcs_plate):
+    converter = ConvertToNGFFPlate(
+        hcs_plate,
+        yx_binning=2,
+        cluster_kwargs=dict(n_workers=1, threads_per_worker=1, processes=False),
+    )
+    assert converter._client is None
+    client = converter._get_client()
+    assert client is converter._get_client()
+    workers = client.scheduler_info()["workers"]
+    assert len(workers) == 1
+    assert all(worker["nthreads"] == 1 for worker in workers.values())
+
+    plate = converter.create_zarr_plate(plate_acquisition)
+    converter.run(
+        plate=plate,
+        plate_acquisition=plate_acquisition,
+        max_layer=1,
+        wells=["D08"],
+        chunks=(1, 1000, 1000),
+    )
+    # The cluster started by the converter is closed after the run.
+    assert client.status == "closed"
+    assert converter._client is None
+    assert converter._local_cluster is None
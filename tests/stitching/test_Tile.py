@@ -15,6 +15,7 @@ def test_fields():
     )
     assert tile.path == "path"
     assert tile.shape == (10, 10)
+    assert tile.ndim == 2
     assert tile.position.time == 0
     assert tile.position.channel == 0
     assert tile.position.z == 0
@@ -83,6 +84,37 @@ def test_load_data(test_img, bgcm, icm):
 
     assert_array_equal(tile.load_data(), (test_img[1] / icm[1]).astype(np.uint8))
 
+    tile = Tile(
+        path=test_img[0],
+        shape=(10, 10),
+        position=TilePosition(time=0, channel=0, z=0, y=0, x=0),
+        background_correction_matrix_path=bgcm[0],
+        illumination_correction_matrix_path=icm[0],
+    )
+
+    assert_array_equal(
+        tile.load_data(),
+        ((test_img[1] - bgcm[1]) / icm[1]).astype(np.uint8),
+    )
+
+
+def test_apply_corrections_out(test_img, bgcm):
+    data = test_img[1]
+    tile = Tile(
+        path=test_img[0],
+        shape=(10, 10),
+        position=TilePosition(time=0, channel=0, z=0, y=0, x=0),
+    )
+    # Without corrections data is copied into out.
+    out = np.full_like(data, 255)
+    assert tile._apply_corrections(data, out=out) is out
+    assert_array_equal(out, data)
+
+    tile.background_correction_matrix_path = bgcm[0]
+    out = np.full_like(data, 255)
+    assert tile._apply_corrections(data, out=out) is out
+    assert_array_equal(out, data - bgcm[1])
+
 
 def test_get_position():
     tile = Tile(
@@ -1,10 +1,23 @@
+import os
 import sys
 from multiprocessing import Process, Queue
+from types import SimpleNamespace
 
+import numpy as np
 import pytest
 from distributed import Client
+from numpy.testing import assert_array_equal
 
-from faim_hcs.dask_utils import LocalClusterFactory
+from faim_hcs import dask_utils
+from faim_hcs.dask_utils import (
+    LocalClusterFactory,
+    PinToNumaNode,
+    get_numa_node_cpus,
+    mean22_uint,
+    mean_cast_to,
+    numa_cluster_kwargs,
+    parse_cpulist,
+)
 
 
 @pytest.mark.skipif(sys.platform == "win32", reason="does not run on windows")
@@ -62,3 +75,89 @@ def test__start_local_cluster(tmp_path_factory):
     client.shutdown()
     p.join()
     assert p.exitcode == 0
+
+
+@pytest.mark.parametrize("use_numba", [True, False])
+@pytest.mark.parametrize("dtype", [np.uint8, np.uint16, np.uint32, np.uint64])
+def test_mean22_uint(dtype, use_numba, monkeypatch):
+    if use_numba:
+        pytest.importorskip("numba")
+    else:
+        monkeypatch.setattr(dask_utils, "njit", None)
+    # The mean of uint64 goes through float64, 2**63 is the largest power of
+    # two which survives the round trip and overflows a uint64 sum.
+    max_value = 2**63 if dtype == np.uint64 else np.iinfo(dtype).max
+    block = np.random.randint(0, max_value, size=(2, 7, 9), dtype=dtype)
+    block[0, :2, :2] = max_value
+    expected = mean_cast_to(dtype)(block[:, :6, :8].reshape(2, 3, 2, 4, 2), axis=(2, 4))
+
+    result = mean22_uint(block)
+    assert result.dtype == dtype
+    assert result.shape == (2, 3, 4)
+    assert result[0, 0, 0] == max_value
+    assert_array_equal(result, expected)
+
+
+def test_parse_cpulist():
+    assert parse_cpulist("0") == {0}
+    assert parse_cpulist("0-3,8-9\n") == {0, 1, 2, 3, 8, 9}
+    assert parse_cpulist("") == set()
+
+
+def test_numa_cluster_kwargs(monkeypatch):
+    monkeypatch.setattr(dask_utils, "get_numa_node_cpus", lambda: [{0, 1}, {2, 3}])
+    assert numa_cluster_kwargs() == dict(
+        n_workers=2,
+        threads_per_worker=2,
+        processes=True,
+        memory_limit="auto",
+    )
+
+    monkeypatch.setattr(dask_utils, "get_numa_node_cpus", lambda: [])
+    monkeypatch.setattr(dask_utils, "get_available_cpus", lambda: {4, 5, 6})
+    kwargs = numa_cluster_kwargs()
+    assert kwargs["n_workers"] == 1
+    assert kwargs["threads_per_worker"] == 3
+
+
+def test_get_numa_node_cpus(monkeypatch):
+    monkeypatch.setattr(
+        dask_utils, "_read_numa_node_cpus", lambda: [{0, 1, 2, 3}, {4, 5, 6, 7}]
+    )
+
+    monkeypatch.setattr(dask_utils, "get_available_cpus", lambda: set(range(8)))
+    assert get_numa_node_cpus() == [{0, 1, 2, 3}, {4, 5, 6, 7}]
+
+    # Partly overlapping with both nodes.
+    monkeypatch.setattr(dask_utils, "get_available_cpus", lambda: {2, 3, 4})
+    assert get_numa_node_cpus() == [{2, 3}, {4}]
+
+    # Disjoint from the first node.
+    monkeypatch.setattr(dask_utils, "get_available_cpus", lambda: {6, 7})
+    assert get_numa_node_cpus() == [{6, 7}]
+
+    # Disjoint from all nodes.
+    monkeypatch.setattr(dask_utils, "get_available_cpus", lambda: {8, 9})
+    assert get_numa_node_cpus() == []
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "sched_getaffinity") or len(os.sched_getaffinity(0)) < 2,
+    reason="requires sched_setaffinity and more than one CPU",
+)
+def test_pin_to_numa_node():
+    cpus = os.sched_getaffinity(0)
+    first, *rest = sorted(cpus)
+    plugin = PinToNumaNode([{first}, set(rest)])
+    try:
+        plugin.setup(SimpleNamespace(name=2))
+        assert os.sched_getaffinity(0) == {first}
+
+        plugin.setup(SimpleNamespace(name=1))
+        assert os.sched_getaffinity(0) == set(rest)
+
+        # Workers without an index are not pinned.
+        plugin.setup(SimpleNamespace(name="not-an-index"))
+        assert os.sched_getaffinity(0) == set(rest)
+    finally:
+        os.sched_setaffinity(0, cpus)